@@ -141,7 +141,7 @@ def _load_bl_cls_refs():
         try:
             cls = eval(module_name)
             log.debug(f"Load: Found original ui class <{module_name}>...")
-        except:
+        except Exception:
             log.debug(f"Load: Unknown original ui class <{module_name}>...")
         else:
             bl_cls_refs.append(cls)
@@ -159,7 +159,7 @@ def _set_simple_ui():
     for cls in bl_cls_refs:
         try:
             unregister_class(cls)
-        except:
+        except Exception:
             log.debug(f"Unregister: unknown original class <{cls}>")
 
     # Register new ui
@@ -180,7 +180,7 @@ def _set_normal_ui():
     for cls in bl_cls_refs:
         try:
             register_class(cls)
-        except:
+        except Exception:
             log.debug(f"Register: unknown original class <{cls}>")
 
 
@@ -38,10 +38,10 @@ class BFScene:
         @param context: the Blender context.
         @param full: if True, return full FDS case.
         @param save: if True, save to disk.
-        @return FDS formatted string (eg. "&OBST ID='Test' /"), or None.
+        @return FDS formatted string (eg. "&OBST ID='Test' /"), or None if saved.
         """
         log.info(f"Export from Scene {self.name}...")
-        text = self.to_fds_list(context=context, full=full).to_string()
+        fds_list, text = self.to_fds_list(context=context, full=full), None
         if save:
             filepath = utils.io.transform_rbl_to_abs(
                 context=context,
@@ -50,7 +50,9 @@ class BFScene:
                 extension=".fds",
             )
             log.info(f"Save to {filepath}...")
-            utils.io.write_txt_file(filepath, text)
+            utils.io.write_fds_file(filepath, fds_list)  # streamed to disk
+        else:
+            text = fds_list.to_string()
         log.info("Done!")
         return text
 
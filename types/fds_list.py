@@ -6,17 +6,74 @@ BlenderFDS, Blender list of FDS namelists or parameters.
 
 import re, logging
 from ..config import DEFAULT_P, MAXLEN, INDENT
-from ..utils.text import append_word
 from .bf_exception import BFException
 
 log = logging.getLogger(__name__)
 
 
+# scan f90_namelists
+_RE_SCAN_F90_NAMELISTS = re.compile(
+    r"""
+    ^&                    # & at the beginning of the line
+    ([A-Z][A-Z0-9]{3})    # namelist label (group 0)
+    [,\s\t]               # 1 separator
+    (                     # namelist params (group 1)
+    (?:'.*?'|".*?"|.*?)*  # 0+ any char, protect quoted strings, greedy
+    )                     # (separators are stripped later)
+    /                     # / end char
+    """,
+    re.VERBOSE | re.DOTALL | re.IGNORECASE | re.MULTILINE,
+)  # MULTILINE, so that ^ is the beginning of each line
+
+# scan f90_params labels, values are the text in between
+_RE_SCAN_F90_LABELS = re.compile(
+    r"""
+    '.*?'|".*?"               # quoted string, skipped (no group)
+    |                         # or
+    (?:^|(?<=[,\s]))          # at the beginning or after a separator
+    ([A-Z][A-Z0-9_\(\):,]*?)  # label (group 0)
+    [,\s\t]*                  # 0+ separators
+    =                         # = sign
+    """,
+    re.VERBOSE | re.DOTALL | re.IGNORECASE,
+)
+
+# separators stripped from f90_params values
+_F90_SEPARATORS = ", \t\n\r\f\v"
+
+# namelist continuation line indent and closing
+_INDENT_SPACES = " " * INDENT
+_CLOSE = " /"
+
+# newlines replaced by spaces in a single pass
+_NEWLINES_TO_SPACES = str.maketrans("\n\r\f\v", "    ")
+
+# scan f90_values
+_RE_SCAN_F90_VALUES = re.compile(
+    r"""'.*?'|".*?"|[^,\s\t]+""", re.VERBOSE | re.DOTALL | re.IGNORECASE
+)
+
+# scan decimal positions
+_RE_SCAN_DECIMAL_POS = re.compile(r"\.([0-9]+)", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+# scan integer postions of exp notation
+_RE_SCAN_INTEGER = re.compile(r"([0-9]*)\.?[0-9]*[eE]", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+
+def _iter_to_string(item):
+    """!Generate the non empty FDS formatted string of an FDSNamelist or FDSParam."""
+    body = item.to_string()
+    if body:
+        yield body
+
+
 class FDSList(list):
     """!
     List of FDSParam, FDSNamelist, FDSList instances.
     """
 
+    __slots__ = ("msgs", "header")  # no instance __dict__, many are created
+
     def __init__(self, iterable=(), f90_namelists=None, f90_params=None, f90_value=None, msgs=(), msg=None, header=None) -> None:
         """!
         Class constructor.
@@ -26,14 +83,14 @@ class FDSList(list):
         """
         super().__init__(iterable)
         ## list of comment message strings.
-        self.msgs = list(msgs)
+        self.msgs = list(msgs) if msgs else []
         if msg:
             self.msgs.append(msg)
         ## header string, that appears only if self is not empty
         self.header = header
 
         # Set iterable from f90
-        if any((f90_namelists, f90_params, f90_value)):
+        if f90_namelists or f90_params or f90_value:
             self.from_fds(f90_namelists=f90_namelists, f90_params=f90_params, f90_value=f90_value)
 
     def __repr__(self) -> str:
@@ -43,6 +100,11 @@ class FDSList(list):
     def __contains__(self, fds_label) -> bool:
         """!Check if fds_label is in self."""
         for item in self:
+            # Exact type lookup first, the common case
+            if type(item) in _LABELED_TYPES:
+                if item.fds_label == fds_label:
+                    return True
+                continue
             match item:
                 case FDSNamelist()|FDSParam():
                     if item.fds_label == fds_label:
@@ -54,6 +116,7 @@ class FDSList(list):
                 case FDSList():
                     if item.__contains__(fds_label=fds_label):
                         return True
+        return False
 
     def get_fds_namelist(self, fds_label=None, remove=False):
         """!Get first FDSNamelist instance in self."""
@@ -98,9 +161,8 @@ class FDSList(list):
                         items.append(item)
                 case FDSList():
                     items.extend(item.get_fds_namelists(fds_label=fds_label, remove=remove))
-        if remove:
-            for i in reversed(indexes):
-                self.pop(i)
+        if remove and indexes:
+            self._remove_indexes(indexes)
         return items
 
     def get_fds_params(self, fds_label=None, remove=False):
@@ -115,103 +177,61 @@ class FDSList(list):
                 # no case FDSMulti()
                 case FDSList():
                     items.extend(item.get_fds_params(fds_label=fds_label, remove=remove))
-        if remove:
-            for i in reversed(indexes):
-                self.pop(i)
+        if remove and indexes:
+            self._remove_indexes(indexes)
         return items
                         
+    def _remove_indexes(self, indexes) -> None:
+        """!Remove the items at indexes from self, in a single pass."""
+        indexes = set(indexes)
+        self[:] = [item for i, item in enumerate(self) if i not in indexes]
+
     def _get_flat_components(self):
         """!Get lists of generated namelists and parameters."""
         # additional namelists, invariant params, multi params
         add_ns, ps, multi_ps = FDSList(), FDSList(), None
         for item in self:
-            match item:
-                case None:
-                    continue
-                case FDSParam():
-                    ps.append(item)
-                case FDSMulti():
-                    if multi_ps:
-                        raise ValueError("Only one FDSMulti in FDSNamelist.")
-                    multi_ps = item
-                    # Replace generators
-                    for i, item in enumerate(multi_ps):
-                        multi_ps[i] = tuple(item)  # break if None
-                case FDSNamelist():
-                    add_ns.append(item)
-                case FDSList():
-                    ps_new, multi_ps_new, add_ns_new = item._get_flat_components()
-                    add_ns.extend(add_ns_new)
-                    ps.extend(ps_new)
-                    if multi_ps_new:
-                        if multi_ps:
-                            raise ValueError("Only one FDSMulti in FDSNamelist (from child).")
-                        multi_ps = multi_ps_new
-                case _:
-                    raise ValueError(f"Unrecognized type of <{item!r}> in <{self!r}>")
+            if item is None:
+                continue
+            handler = _FLAT_HANDLERS.get(type(item)) or _get_flat_handler(self, item)
+            multi_ps = handler(item, ps, multi_ps, add_ns)
         return ps, multi_ps, add_ns
 
+    def _iter_strings(self):
+        """!
+        Generate the non empty FDS formatted strings of self, to be joined by newlines.
+        """
+        header = self.header  # appears only if self is not empty
+        if self.msgs:
+            for m in self.msgs:
+                if m:
+                    if header:
+                        yield header
+                        header = None
+                    yield m
+        for item in self:
+            for b in item._iter_strings():
+                if header:
+                    yield header
+                    header = None
+                yield b
+
     def to_string(self) -> str:
         """!
         Return the FDS formatted string.
         """
-        body = list()
-        body.extend(self.msgs)
-        body.extend(item.to_string() for item in self)
-        body = "\n".join(b for b in body if b) # rm empty bodies
-        if self.header and body:
-            body = "\n".join((self.header, body))
-        return body
-
-    # scan f90_namelists
-    _RE_SCAN_F90_NAMELISTS = re.compile(  
-        r"""
-        ^&                    # & at the beginning of the line
-        ([A-Z][A-Z0-9]{3})    # namelist label (group 0)
-        [,\s\t]               # 1 separator
-        (                     # namelist params (group 1)
-        (?:'.*?'|".*?"|.*?)*  # 0+ any char, protect quoted strings, greedy
-        )                     # (separators are stripped later)
-        /                     # / end char
-        """,
-        re.VERBOSE | re.DOTALL | re.IGNORECASE | re.MULTILINE,
-    )  # MULTILINE, so that ^ is the beginning of each line
-
-    # scan f90_params
-    _RE_SCAN_F90_PARAMS = re.compile(  
-        r"""
-        ([A-Z][A-Z0-9_\(\):,]*?)  # label (group 0)
-        [,\s\t]*                  # 0+ separators
-        =                         # = sign
-        [,\s\t]*                  # 0+ separators
-        (                         # value (group 1)
-            (?:'.*?'|".*?"|.+?)*?     # 1+ any char, protect str, not greedy
-                (?=                       # end previous match when:
-                    (?:                       # there is another label:
-                        [,\s\t]+                  # 1+ separators
-                        [A-Z][A-Z0-9_\(\):,]*?    # label
-                        [,\s\t]*                  # 0+ separators
-                        =                         # = sign
-                    )
-                |                         # or
-                    $                         # it is end of line
-                )
-        )
-        """,
-        re.VERBOSE | re.DOTALL | re.IGNORECASE,
-    )  # no MULTILINE, so that $ is the end of the file
-
-    # scan f90_values
-    _RE_SCAN_F90_VALUES = re.compile(
-        r"""'.*?'|".*?"|[^,\s\t]+""", re.VERBOSE | re.DOTALL | re.IGNORECASE
-    )
-
-    # scan decimal positions
-    _RE_SCAN_DECIMAL_POS = re.compile(r"\.([0-9]+)", re.VERBOSE | re.DOTALL | re.IGNORECASE )
-
-    # scan integer postions of exp notation
-    _RE_SCAN_INTEGER = re.compile(r"([0-9]*)\.?[0-9]*[eE]", re.VERBOSE | re.DOTALL | re.IGNORECASE)
+        return "\n".join(self._iter_strings())
 
+    def to_file(self, f) -> None:
+        """!
+        Write the FDS formatted string to a writable file object, one string at a time.
+        @param f: writable text file object.
+        """
+        write = f.write
+        for i, b in enumerate(self._iter_strings()):
+            if i:
+                write("\n")
+            write(b)
 
     def from_fds(self, f90_namelists=None, f90_params=None, f90_value=None) -> None:
         """!
@@ -222,25 +242,44 @@ class FDSList(list):
 
         if f90_namelists:
             # Import from F90 case to list of FDSNamelist
-            for match in re.finditer(self._RE_SCAN_F90_NAMELISTS, f90_namelists):
+            append = self.append
+            for match in _RE_SCAN_F90_NAMELISTS.finditer(f90_namelists):
                 label, f90_params = match.groups()
                 fds_namelist = FDSNamelist(fds_label=label)
                 fds_namelist.from_fds(f90_params=f90_params)
-                self.append(fds_namelist)
+                append(fds_namelist)
 
         elif f90_params:
             # Import from F90 namelist parameters to list of FDSParams
             # Rm trailing separators and newlines
-            f90_params = " ".join(f90_params.strip(", \t").splitlines())
-            for match in re.finditer(self._RE_SCAN_F90_PARAMS, f90_params):
-                label, f90_value = match.groups()
-                self.append(FDSParam(fds_label=label, f90_value=f90_value))
+            f90_params = f90_params.translate(_NEWLINES_TO_SPACES).strip(", \t")
+            # The value of each label ends where the next label starts
+            append = self.append
+            label, start, pos = None, 0, 0
+            while True:
+                match = _RE_SCAN_F90_LABELS.search(f90_params, pos)
+                if not match:
+                    break
+                pos = match.end()
+                if match.group(1) is None:  # quoted string
+                    continue
+                if label:
+                    f90_value = f90_params[start:match.start()].strip(_F90_SEPARATORS)
+                    if not f90_value:
+                        # values are not empty, so this is the value (eg. "CHECK= T,ID=")
+                        pos = match.start() + 1
+                        continue
+                    append(FDSParam(fds_label=label, f90_value=f90_value))
+                label, start = match.group(1), match.end()
+            if label:
+                f90_value = f90_params[start:].strip(_F90_SEPARATORS)
+                append(FDSParam(fds_label=label, f90_value=f90_value))
 
         elif f90_value:
             # Import from F90 parameter values to list of pyvalues
             # Remove trailing spaces and newlines, then scan values
-            f90_value = " ".join(f90_value.strip().splitlines())
-            values = re.findall(self._RE_SCAN_F90_VALUES, f90_value)
+            f90_value = f90_value.translate(_NEWLINES_TO_SPACES).strip()
+            values = _RE_SCAN_F90_VALUES.findall(f90_value)
 
             # Eval values
             for i, v in enumerate(values):
@@ -258,10 +297,10 @@ class FDSList(list):
             # Post treatment of float
             if isinstance(values[0], float):  # first value is a float
                 # Get precision
-                match = re.findall(self._RE_SCAN_DECIMAL_POS, f90_value)
+                match = _RE_SCAN_DECIMAL_POS.findall(f90_value)
                 self.precision = match and max(len(m) for m in match) or 1
                 # Get exponential
-                match = re.findall(self._RE_SCAN_INTEGER, f90_value)
+                match = _RE_SCAN_INTEGER.findall(f90_value)
                 if match:
                     self.exponential = True
                     self.precision += max(len(m) for m in match) - 1
@@ -274,6 +313,8 @@ class FDSMulti(FDSList):
     FDSList of iterator instances.
     """
 
+    __slots__ = ()
+
     def from_fds(self, f90_namelists) -> None:
         raise Exception("Not implemented.")
 
@@ -282,6 +323,8 @@ class FDSNamelist(FDSList):
     List representing an FDS namelist.
     """
 
+    __slots__ = ("fds_label",)
+
     def __init__(self, fds_label, iterable=(), f90_params=None, msgs=(), msg=None) -> None:
         """!
         Class constructor.
@@ -313,23 +356,22 @@ class FDSNamelist(FDSList):
         # Treat ps and multi_ps related to self
         self.clear()
         if multi_ps:
-            # Rm duplicated ps
-            for mp in multi_ps:
-                fds_label = mp[0].fds_label  # break if mp empty
-                ps.get_fds_param(fds_label=fds_label, remove=True)
+            # Rm duplicated ps, only the first one for each multi label
+            fds_labels = {mp[0].fds_label for mp in multi_ps}  # break if mp empty
+            ps_new = list()
+            for p in ps:
+                if p.fds_label in fds_labels:
+                    fds_labels.discard(p.fds_label)
+                else:
+                    ps_new.append(p)
+            ps = ps_new
             # Get FDSMulti msgs, before deletion
             ns.msgs.extend(multi_ps.msgs)
-            # Zip multi_ps
-            multi_ps = list(zip(*(mp for mp in multi_ps if mp)))
-            # Extend with invariant parameters: mp + ps
-            for i, mp in enumerate(multi_ps):
-                multi_ps[i] = list(mp)
-                multi_ps[i].extend(ps)
-            # Build multi namelists and save them
-            for mp in multi_ps:
-                n = self.clone()
-                n.extend(mp)
-                ns.append(n)
+            # Zip multi_ps, then build multi namelists
+            # with invariant parameters: mp + ps, and save them
+            fds_label, msgs = self.fds_label, self.msgs
+            for mp in zip(*(mp for mp in multi_ps if mp)):
+                ns.append(FDSNamelist(fds_label=fds_label, iterable=(*mp, *ps), msgs=msgs))
         else:
             # Rebuild depurated self
             self.extend(ps)
@@ -341,33 +383,41 @@ class FDSNamelist(FDSList):
 
     def _flat_n_to_string(self, n) -> str:
         """Get string representation of flat namelist."""
-        body = list()
-
-        # Add namelist and param msgs
-        body.extend(n.msgs)
-        msg = " | ".join(m for p in n for m in p.msgs)
-        if msg:
-            body.append(msg)
-
-        # Add namelist
-        body.append(f"&{self.fds_label}")
+        lines, p_msgs = list(), list()
+
+        # Add namelist, the current line is a list of words
+        # and col its length, so that no string is rescanned
+        line = [f"&{self.fds_label}"]
+        col = len(line[0])
+        # local bindings for the loop
+        append, lines_append, maxlen, indent = line.append, lines.append, MAXLEN, INDENT
         for p in n:
-            fds_label, fds_values = p.fds_label, p._to_strings()
-            if not fds_values:  # fds_label only provided, probably preformatted (eg. BFParamOther)
-                body = append_word(body, word=fds_label)
-            else:  # fds_label and its values provided
-                word = f"{fds_label}={','.join(fds_values)}"
-                if len(word) <= MAXLEN - INDENT or len(fds_values) == 1:
-                    # short param, keep together
-                    body = append_word(body, word=word)
+            if p.msgs:
+                p_msgs.extend(p.msgs)
+            for separator, word, wlen in p._to_words():
+                if col + len(separator) + wlen <= maxlen:
+                    # append to current line
+                    append(separator)
+                    append(word)
+                    col += len(separator) + wlen
                 else:
-                    # long param, split in lines
-                    body = append_word(body, word=f"{fds_label}={fds_values[0]},")  # first
-                    for v in fds_values[1:-1]:
-                        body = append_word(body, word=f"{v},", separator="")
-                    body = append_word(body, word=f"{fds_values[-1]}", separator="")  # last
-        body[-1] += " /"  # close
-        return "\n".join(body)
+                    # append to new line w indent, wo separator
+                    lines_append("".join(line))
+                    line = [_INDENT_SPACES, word]
+                    append = line.append
+                    col = indent + wlen
+        line.append(_CLOSE)
+        lines.append("".join(line))
+
+        # Prepend namelist and param msgs, collected while formatting,
+        # most namelists have none
+        if p_msgs:
+            msg = " | ".join(p_msgs)
+            if msg:
+                lines.insert(0, msg)
+        if n.msgs:
+            lines[:0] = n.msgs
+        return "\n".join(lines)
 
     def to_string(self) -> str:
         """Get string representation."""
@@ -377,12 +427,16 @@ class FDSNamelist(FDSList):
         else:
             return ns.to_string()
 
+    _iter_strings = _iter_to_string  # whole namelist string
+
 
 class FDSParam(FDSList):
     """!
     List representing an FDS parameter.
     """
 
+    __slots__ = ("fds_label", "precision", "exponential", "_strings", "_words")
+
     def __init__(self, fds_label, iterable=(), value=None, f90_value=None, precision=DEFAULT_P, exponential=False, msgs=(), msg=None) -> None:
         """!
         Class constructor.
@@ -401,6 +455,10 @@ class FDSParam(FDSList):
         self.precision = precision
         ## if True sets exponential representation of floats
         self.exponential = exponential
+        ## cached FDS formatted values, reset by set_value()
+        self._strings = None
+        ## cached FDS formatted words, reset by set_value()
+        self._words = None
         # Init
         super().__init__(iterable=iterable, f90_value=f90_value, msgs=msgs, msg=msg)
         # Set parameter value from f90_value
@@ -425,6 +483,7 @@ class FDSParam(FDSList):
         """!
         Set self.values from value.
         """
+        self._strings, self._words = None, None
         self.clear()
         match value:
             case None:
@@ -437,6 +496,47 @@ class FDSParam(FDSList):
     def _to_strings(self) -> tuple:
         """!
         Return a tuple of FDS formatted values or an empty tuple, eg. "'Test1'","'Test2'".
+        The result is cached, as the same invariant param is exported
+        in each namelist generated by an FDSMulti.
+        """
+        if self._strings is None:
+            self._strings = self._format_strings()
+        return self._strings
+
+    def _to_words(self) -> tuple:
+        """!
+        Return a tuple of (separator, word, word length) to be wrapped in namelist lines.
+        The result is cached, as the invariant params of an FDSMulti are
+        wrapped once for each generated namelist.
+        """
+        if self._words is None:
+            self._words = self._format_words()
+        return self._words
+
+    def _format_words(self) -> tuple:
+        """!
+        Split self in words, keeping short params together.
+        """
+        fds_label, fds_values = self.fds_label, self._to_strings()
+        if not fds_values:  # fds_label only provided, probably preformatted (eg. BFParamOther)
+            return ((" ", fds_label, len(fds_label)),)
+        # fds_label and its values provided
+        llen = len(fds_label) + 1  # "LABEL="
+        vlens = [len(v) for v in fds_values]
+        wlen = llen + sum(vlens) + len(vlens) - 1  # "LABEL=v0,v1,v2"
+        if wlen <= MAXLEN - INDENT or len(fds_values) == 1:
+            # short param, keep together
+            return ((" ", f"{fds_label}={','.join(fds_values)}", wlen),)
+        # long param, split in lines
+        words = [(" ", f"{fds_label}={fds_values[0]},", llen + vlens[0] + 1)]  # first
+        for i in range(1, len(fds_values) - 1):
+            words.append(("", f"{fds_values[i]},", vlens[i] + 1))
+        words.append(("", fds_values[-1], vlens[-1]))  # last
+        return tuple(words)
+
+    def _format_strings(self) -> tuple:
+        """!
+        Format self values to a tuple of FDS formatted strings.
         """
         if not len(self):  # no content
             return tuple()
@@ -457,6 +557,8 @@ class FDSParam(FDSList):
             case _:
                 raise ValueError(f"Unknown value type <{self[0]}> in {self}")
 
+    _iter_strings = _iter_to_string  # whole param string
+
     def to_string(self) -> str:  # used by SN_MULT and SN_MOVE when importing 
         """!
         Return the FDS formatted string.
@@ -467,3 +569,50 @@ class FDSParam(FDSList):
                 return f"{self.fds_label}={v}"
             else:  # "ABC"
                 return self.fds_label
+
+
+# Types checked first by FDSList.__contains__
+_LABELED_TYPES = frozenset((FDSNamelist, FDSParam))
+
+# Handlers of FDSList._get_flat_components, by item type
+
+def _flat_param(item, ps, multi_ps, add_ns):
+    ps.append(item)
+    return multi_ps
+
+def _flat_multi(item, ps, multi_ps, add_ns):
+    if multi_ps:
+        raise ValueError("Only one FDSMulti in FDSNamelist.")
+    # Replace generators
+    for i, subitem in enumerate(item):
+        item[i] = tuple(subitem)  # break if None
+    return item
+
+def _flat_namelist(item, ps, multi_ps, add_ns):
+    add_ns.append(item)
+    return multi_ps
+
+def _flat_list(item, ps, multi_ps, add_ns):
+    ps_new, multi_ps_new, add_ns_new = item._get_flat_components()
+    add_ns.extend(add_ns_new)
+    ps.extend(ps_new)
+    if multi_ps_new:
+        if multi_ps:
+            raise ValueError("Only one FDSMulti in FDSNamelist (from child).")
+        return multi_ps_new
+    return multi_ps
+
+# ordered from the most specific type, for the isinstance fallback
+_FLAT_HANDLERS = {
+    FDSParam: _flat_param,
+    FDSMulti: _flat_multi,
+    FDSNamelist: _flat_namelist,
+    FDSList: _flat_list,
+}
+
+def _get_flat_handler(fds_list, item):
+    """!Get the handler of an item whose type is a subclass, on error raise ValueError."""
+    for cls, handler in _FLAT_HANDLERS.items():
+        if isinstance(item, cls):
+            return handler
+    raise ValueError(f"Unrecognized type of <{item!r}> in <{fds_list!r}>")
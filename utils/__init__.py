@@ -1,5 +1,5 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
-from . import geometry, io, gis, ui, binpacking, text, updater
+from . import geometry, io, gis, ui, binpacking, updater
 
 # Nothing to register here
@@ -61,6 +61,26 @@ def write_txt_file(filepath, text=None, force_dir=False):
         raise BFException(None, f"Error writing file: <{filepath}>\n{err}")
 
 
+def write_fds_file(filepath, fds_list, force_dir=False):
+    """!
+    Write the FDS formatted string of fds_list to filepath, without joining it in memory.
+    Stream to a temporary file, that replaces filepath only when completed,
+    so that a formatting error leaves the existing file untouched.
+    """
+    tmp_filepath = f"{filepath}.tmp"
+    try:
+        if force_dir:
+            make_dir(filepath)
+        with open(tmp_filepath, "w", encoding="utf8", errors="ignore") as f:
+            fds_list.to_file(f)
+        os.replace(tmp_filepath, filepath)
+    except OSError as err:
+        raise BFException(None, f"Error writing file: <{filepath}>\n{err}")
+    finally:
+        if os.path.exists(tmp_filepath):  # not completed
+            os.remove(tmp_filepath)
+
+
 # Transform paths
 
 # Paths notes: